@@ -1,7 +1,10 @@
 """
 I/O for FLAC3D format.
 """
+import io
 import logging
+import mmap
+import os
 import struct
 import time
 
@@ -84,12 +87,25 @@ meshio_to_flac3d_order_2 = {
 }
 
 
+# Converted once to compact numpy indexers so that the reorderings in
+# _translate_zones do not rebuild an index array per call
+meshio_to_flac3d_order = {
+    k: np.array(v, dtype=np.int8) for k, v in meshio_to_flac3d_order.items()
+}
+meshio_to_flac3d_order_2 = {
+    k: np.array(v, dtype=np.int8) for k, v in meshio_to_flac3d_order_2.items()
+}
+
+
 flag_to_numdim = {
     "zone": 3,
     "face": 2,
 }
 
 
+point_dtype = np.dtype([("pid", "<u4"), ("xyz", "<f8", 3)])
+
+
 def read(filename):
     """Read FLAC3D f3grid grid file."""
     # Read a small block of the file to assess its type
@@ -115,189 +131,290 @@ def read_buffer(f, binary):
     }
 
     points = []
-    point_ids = {}
+    point_ids = _id_lut([])
     cells = []
     field_data = {}
 
     # Zones and faces do not share the same cell ID pool in FLAC3D
     # i.e. a given cell ID can be assigned to a zone and a face concurrently
-    mapper = {"zone": {}, "face": {}}
+    cell_ids = {"zone": [], "face": []}
+    cell_pos = {"zone": [], "face": []}
+    groups = {"zone": [], "face": []}
     slots = {"zone": set(), "face": set()}
 
-    pidx = 0
     cidx = 0
     gidx = 0
     if binary:
-        # Not sure what the first bytes represent, the format might be wrong
-        # It does not seem to be useful anyway
-        _ = struct.unpack("<2I", f.read(8))
-
-        (num_nodes,) = struct.unpack("<I", f.read(4))
-        for pidx in range(num_nodes):
-            pid, point = _read_point(f, binary)
-            points.append(point)
-            point_ids[pid] = pidx
+        # Binary grids are read by streaming the whole file, so let the
+        # kernel know and get aggressive readahead on cold-cache loads.
+        # No-op where unsupported (non-POSIX, in-memory buffers, ...).
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except (OSError, io.UnsupportedOperation):
+                pass
+
+        # Map the whole file into memory and parse it with offset
+        # arithmetic; views are served zero-copy by the page cache
+        buf = _memory_map(f)
+
+        # Not sure what the first 8 bytes represent, the format might be
+        # wrong. They do not seem to be useful anyway
+        off = 8
+
+        # Read the whole points block in one go instead of looping over
+        # individual records
+        (num_nodes,) = struct.unpack_from("<I", buf, off)
+        off += 4
+        pdata = np.frombuffer(buf, point_dtype, count=num_nodes, offset=off)
+        off += num_nodes * point_dtype.itemsize
+        points = pdata["xyz"]
+        point_ids = _id_lut(pdata["pid"])
 
         for flag in ["zone", "face"]:
-            (num_cells,) = struct.unpack("<I", f.read(4))
-            for _ in range(num_cells):
-                cid, cell = _read_cell(f, point_ids, binary)
-                cells = _update_cells(cells, cell, flag)
-                mapper[flag][cid] = [cidx]
-                cidx += 1
-
-            (num_groups,) = struct.unpack("<I", f.read(4))
+            (num_cells,) = struct.unpack_from("<I", buf, off)
+            off += 4
+            blocks, block_cids, off = _read_cells(buf, off, num_cells)
+            for cell_block, cids in zip(blocks, block_cids):
+                cell_block = _translate_ids(point_ids, cell_block)
+                cells = _update_cells(cells, cell_block, flag)
+                cell_ids[flag].append(cids)
+                cell_pos[flag].append(np.arange(cidx, cidx + len(cids)))
+                cidx += len(cids)
+
+            (num_groups,) = struct.unpack_from("<I", buf, off)
+            off += 4
             for _ in range(num_groups):
-                name, slot, data = _read_group(f, binary)
-                field_data, mapper[flag] = _update_field_data(
-                    field_data,
-                    mapper[flag],
-                    data,
-                    name,
-                    gidx + 1,
-                    flag,
-                )
-                slots[flag] = _update_slots(slots[flag], slot)
+                name, slot, data, off = _read_group(buf, off)
                 gidx += 1
-    else:
-        line = f.readline().rstrip().split()
-        while line:
-            if line[0] == "G":
-                pid, point = _read_point(line, binary)
-                points.append(point)
-                point_ids[pid] = pidx
-                pidx += 1
-            elif line[0] in {"Z", "F"}:
-                flag = flags[line[0]]
-                cid, cell = _read_cell(line, point_ids, binary)
-                cells = _update_cells(cells, cell, flag)
-                mapper[flag][cid] = [cidx]
-                cidx += 1
-            elif line[0] in {"ZGROUP", "FGROUP"}:
-                flag = flags[line[0]]
-                name, slot, data = _read_group(f, binary, line)
-                field_data, mapper[flag] = _update_field_data(
-                    field_data,
-                    mapper[flag],
-                    data,
-                    name,
-                    gidx + 1,
-                    flag,
-                )
+                groups[flag].append((gidx, data))
+                field_data[name] = np.array([gidx, flag_to_numdim[flag]])
                 slots[flag] = _update_slots(slots[flag], slot)
-                gidx += 1
+    else:
+        # Read the whole file at once and classify lines by their first
+        # token. All lines of a kind can then be parsed in bulk with numpy
+        # instead of token by token in Python.
+        lines = f.read().splitlines()
+        heads = np.array(
+            [line.split(None, 1)[0] if line.strip() else "*" for line in lines],
+            dtype=str,
+        )
 
-            line = f.readline().rstrip().split()
+        # Points
+        idx_points = np.flatnonzero(heads == "G")
+        if len(idx_points):
+            pdata = np.loadtxt(
+                (lines[i] for i in idx_points), usecols=(1, 2, 3, 4), ndmin=2
+            )
+            points = pdata[:, 1:]
+            point_ids = _id_lut(pdata[:, 0].astype(np.int64))
+
+        # Cells, parsed per contiguous run of lines with the same cell type
+        idx_cells = np.flatnonzero((heads == "Z") | (heads == "F"))
+        ctypes = np.array([lines[i].split(None, 2)[1] for i in idx_cells], dtype=str)
+        breaks = (
+            np.flatnonzero(
+                (ctypes[1:] != ctypes[:-1])
+                | (heads[idx_cells][1:] != heads[idx_cells][:-1])
+            )
+            + 1
+        )
+        for run in np.split(idx_cells, breaks):
+            if not len(run):
+                continue
+
+            flag = flags[heads[run[0]]]
+            num_verts = int(ctypes[np.searchsorted(idx_cells, run[0])][1:])
+            cdata = np.loadtxt(
+                (lines[i] for i in run),
+                dtype=int,
+                usecols=range(2, 3 + num_verts),
+                ndmin=2,
+            )
+            cids, cell_block = cdata[:, 0], _translate_ids(point_ids, cdata[:, 1:])
+            if num_verts == 7:
+                cell_block = np.column_stack([cell_block, cell_block[:, -1]])
+
+            cells = _update_cells(cells, cell_block, flag)
+            cell_ids[flag].append(cids)
+            cell_pos[flag].append(np.arange(cidx, cidx + len(cids)))
+            cidx += len(cids)
+
+        # Groups. Data lines directly following a group header belong to it.
+        idx_groups = np.flatnonzero((heads == "ZGROUP") | (heads == "FGROUP"))
+        idx_data = np.flatnonzero(np.char.isdigit(heads))
+        for i in idx_groups:
+            flag = flags[heads[i]]
+            cand = idx_data[np.searchsorted(idx_data, i) :]
+            consecutive = cand == i + 1 + np.arange(len(cand))
+            num_lines = len(cand) if consecutive.all() else np.argmin(consecutive)
+            name, slot = _read_group_header(lines[i])
+            tokens = " ".join(lines[j] for j in cand[:num_lines]).split()
+            data = np.fromiter(map(int, tokens), dtype=np.int64, count=len(tokens))
+            gidx += 1
+            groups[flag].append((gidx, data))
+            field_data[name] = np.array([gidx, flag_to_numdim[flag]])
+            slots[flag] = _update_slots(slots[flag], slot)
+
+    cells = [(k, np.vstack(v)) for k, v in cells]
 
     if field_data:
         num_cells = np.cumsum([len(c[1]) for c in cells])
         cell_data = np.zeros(num_cells[-1], dtype=int)
-        for k, v in mapper.items():
-            if not slots[k]:
+        for flag in ["zone", "face"]:
+            if not slots[flag] or not cell_ids[flag]:
                 continue
 
-            for cid, zid in v.values():
-                cell_data[cid] = zid
+            # Map group entries to positions in the global cell list through
+            # the cell-ID LUT, validating every reference
+            lut = _id_lut(np.concatenate(cell_ids[flag]))
+            pos = np.concatenate(cell_pos[flag])
+            for gidx, data in groups[flag]:
+                cell_data[pos[_translate_ids(lut, data)]] = gidx
         cell_data = {"flac3d:group": np.split(cell_data, num_cells[:-1])}
     else:
         cell_data = {}
 
     return Mesh(
         points=np.array(points),
-        cells=[(k, np.array(v)[:, flac3d_to_meshio_order[k]]) for k, v in cells],
+        cells=[(k, v[:, flac3d_to_meshio_order[k]]) for k, v in cells],
         cell_data=cell_data,
         field_data=field_data,
     )
 
 
-def _read_point(buf_or_line, binary):
-    """Read point coordinates."""
-    if binary:
-        pid, x, y, z = struct.unpack("<I3d", buf_or_line.read(28))
-        point = [x, y, z]
-    else:
-        pid = int(buf_or_line[1])
-        point = [float(l) for l in buf_or_line[2:]]
-
-    return pid, point
+def _memory_map(f):
+    """Memory-map an open binary file; fall back to reading it."""
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        f.seek(0)
+        return f.read()
 
 
-def _read_cell(buf_or_line, point_ids, binary):
-    """Read cell connectivity."""
-    if binary:
-        cid, num_verts = struct.unpack("<2I", buf_or_line.read(8))
-        cell = struct.unpack(f"<{num_verts}I", buf_or_line.read(4 * num_verts))
-        is_b7 = num_verts == 7
-    else:
-        cid = int(buf_or_line[2])
-        cell = buf_or_line[3:]
-        is_b7 = buf_or_line[1] == "B7"
+def _id_lut(ids):
+    """Build a lookup table translating FLAC3D IDs to indices.
 
-    cell = [point_ids[int(l)] for l in cell]
-    if is_b7:
-        cell.append(cell[-1])
-
-    return cid, cell
-
-
-def _read_group(buf_or_line, binary, line=None):
-    """Read cell group."""
-    if binary:
-        # Group name
-        (num_chars,) = struct.unpack("<H", buf_or_line.read(2))
-        (name,) = struct.unpack(f"<{num_chars}s", buf_or_line.read(num_chars))
-        name = name.decode()
-
-        # Slot name
-        (num_chars,) = struct.unpack("<H", buf_or_line.read(2))
-        (slot,) = struct.unpack(f"<{num_chars}s", buf_or_line.read(num_chars))
-        slot = slot.decode()
-
-        # Zones
-        (num_zones,) = struct.unpack("<I", buf_or_line.read(4))
-        data = struct.unpack(f"<{num_zones}I", buf_or_line.read(4 * num_zones))
-    else:
-        line = " ".join(line).replace("'", '"')
-        line = [l.strip() for l in line.split('"') if l]
-        name = line[1]
-        data = []
-        slot = "" if "SLOT" not in line else line[-1]
-
-        i = buf_or_line.tell()
-        line = buf_or_line.readline()
-        while True:
-            line = line.rstrip().split()
-            if line and (line[0] not in {"*", "ZGROUP", "FGROUP"}):
-                data += [int(l) for l in line]
-            else:
-                buf_or_line.seek(i)
-                break
-            i = buf_or_line.tell()
-            line = buf_or_line.readline()
-
-    return name, slot, data
-
-
-def _update_cells(cells, cell, flag):
-    """Update cell list."""
-    cell_type = numnodes_to_meshio_type[flag][len(cell)]
+    IDs are dense in practice, so a flat table indexed by ID is the fast
+    path. They are stored as u4 though, so one stray huge ID could inflate
+    the table to tens of GB; fall back to searching the sorted IDs in that
+    case. Missing IDs map to -1 so invalid references can be detected.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    size = int(ids.max()) + 1 if len(ids) else 1
+    if size > max(8 * len(ids), 65536):
+        order = np.argsort(ids)
+        return ids[order], order
+
+    lut = np.full(size, -1, dtype=np.int64)
+    lut[ids] = np.arange(len(ids))
+
+    return lut
+
+
+def _translate_ids(lut, ids):
+    """Translate IDs through an _id_lut table, validating every reference."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if isinstance(lut, tuple):
+        sorted_ids, order = lut
+        pos = np.searchsorted(sorted_ids, ids)
+        pos[pos == len(sorted_ids)] = 0
+        if not (sorted_ids[pos] == ids).all():
+            raise ReadError("Reference to an unknown ID")
+        return order[pos]
+
+    if (ids < 0).any() or (ids >= len(lut)).any():
+        raise ReadError("Reference to an unknown ID")
+    idx = lut[ids]
+    if (idx == -1).any():
+        raise ReadError("Reference to an unknown ID")
+
+    return idx
+
+
+def _read_cells(buf, off, num_cells, dtype="<u4"):
+    """Read binary cell connectivity blocks.
+
+    Each record is `cid, num_verts, verts...`. Records cannot be strided
+    uniformly, but the vertex count is constant over long runs, so detect
+    each run at once: assume the current record's count holds, check all
+    candidate header positions in one vectorized compare, and cut the run
+    at the first mismatch.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    ints = np.frombuffer(buf, dtype, count=(len(buf) - off) // itemsize, offset=off)
+    blocks = []
+    block_cids = []
+    cur = 0
+    done = 0
+    while done < num_cells:
+        num_verts = int(ints[cur + 1])
+        stride = 2 + num_verts
+        max_run = min(num_cells - done, (len(ints) - cur) // stride)
+        if max_run < 1:
+            raise ReadError("Invalid cell section")
+
+        counts = ints[cur + 1 : cur + max_run * stride : stride]
+        mismatch = np.flatnonzero(counts != num_verts)
+        run = int(mismatch[0]) if len(mismatch) else max_run
+
+        records = ints[cur : cur + run * stride].reshape(run, stride)
+        block_cids.append(records[:, 0])
+        cell_block = records[:, 2:]
+        if num_verts == 7:
+            cell_block = np.column_stack([cell_block, cell_block[:, -1]])
+        blocks.append(cell_block)
+
+        done += run
+        cur += run * stride
+
+    return blocks, block_cids, off + cur * itemsize
+
+
+def _read_group(buf, off):
+    """Read binary cell group."""
+    # Group name
+    (num_chars,) = struct.unpack_from("<H", buf, off)
+    off += 2
+    name = buf[off : off + num_chars].decode()
+    off += num_chars
+
+    # Slot name
+    (num_chars,) = struct.unpack_from("<H", buf, off)
+    off += 2
+    slot = buf[off : off + num_chars].decode()
+    off += num_chars
+
+    # Zones
+    (num_zones,) = struct.unpack_from("<I", buf, off)
+    off += 4
+    data = np.frombuffer(buf, "<u4", count=num_zones, offset=off)
+    off += 4 * num_zones
+
+    return name, slot, data, off
+
+
+def _read_group_header(line):
+    """Read ASCII group name and slot."""
+    line = " ".join(line.split()).replace("'", '"')
+    line = [l.strip() for l in line.split('"') if l]
+    name = line[1]
+    slot = "" if "SLOT" not in line else line[-1]
+
+    return name, slot
+
+
+def _update_cells(cells, cell_block, flag):
+    """Append a cell block, merging it with the previous block if types match."""
+    cell_type = numnodes_to_meshio_type[flag][np.shape(cell_block)[1]]
     if len(cells) > 0 and cell_type == cells[-1][0]:
-        cells[-1][1].append(cell)
+        cells[-1][1].append(cell_block)
     else:
-        cells.append((cell_type, [cell]))
+        cells.append((cell_type, [cell_block]))
 
     return cells
 
 
-def _update_field_data(field_data, mapper, data, name, gidx, flag):
-    """Update field data dict."""
-    for cid in data:
-        mapper[cid].append(gidx)
-    field_data[name] = np.array([gidx, flag_to_numdim[flag]])
-
-    return field_data, mapper
-
-
 def _update_slots(slots, slot):
     """Update slot set. Only one slot is supported."""
     slots.add(slot)
@@ -330,30 +447,39 @@ def write(filename, mesh, float_fmt=".16e", binary=False):
     mode = "wb" if binary else "w"
     with open_file(filename, mode) as f:
         if binary:
-            f.write(
+            # Accumulate the many small header/cell/group writes in memory
+            # and flush the file in a single write
+            out = io.BytesIO()
+            out.write(
                 struct.pack("<2I", 1375135718, 3)
             )  # Don't know what these values represent
         else:
-            f.write(f"* FLAC3D grid produced by meshio v{version}\n")
-            f.write(f"* {time.ctime()}\n")
+            out = f
+            out.write(f"* FLAC3D grid produced by meshio v{version}\n")
+            out.write(f"* {time.ctime()}\n")
 
-        _write_points(f, mesh.points, binary, float_fmt)
+        _write_points(out, mesh.points, binary, float_fmt)
         for flag in ["zone", "face"]:
-            _write_cells(f, mesh.points, mesh.cells, flag, binary)
-            _write_groups(f, mesh.cells, material, mesh.field_data, flag, binary)
+            _write_cells(out, mesh.points, mesh.cells, flag, binary)
+            _write_groups(out, mesh.cells, material, mesh.field_data, flag, binary)
+
+        if binary:
+            f.write(out.getbuffer())
 
 
 def _write_points(f, points, binary, float_fmt=None):
     """Write points coordinates."""
     if binary:
         f.write(struct.pack("<I", len(points)))
-        for i, point in enumerate(points):
-            f.write(struct.pack("<I3d", i + 1, *point))
+        pdata = np.empty(len(points), dtype=point_dtype)
+        pdata["pid"] = np.arange(1, len(points) + 1)
+        pdata["xyz"] = points
+        f.write(pdata.tobytes())
     else:
         f.write("* GRIDPOINTS\n")
-        for i, point in enumerate(points):
-            fmt = "G\t{:8}\t" + "\t".join(3 * ["{:" + float_fmt + "}"]) + "\n"
-            f.write(fmt.format(i + 1, *point))
+        idx = np.arange(1, len(points) + 1).reshape(-1, 1)
+        fmt = "G\t%8d\t" + "\t".join(3 * ["%" + float_fmt])
+        np.savetxt(f, np.hstack([idx, points]), fmt=fmt)
 
 
 def _write_cells(f, points, cells, flag, binary):
@@ -390,10 +516,12 @@ def _write_cells(f, points, cells, flag, binary):
 
         f.write(f"* {entity}\n")
         for ctype, cdata in cells:
-            fmt = f"{abbrev} {{}} {{}} " + " ".join(["{}"] * cdata.shape[1]) + "\n"
-            for entry in cdata + 1:
-                count += 1
-                f.write(fmt.format(meshio_to_flac3d_type[ctype], count, *entry))
+            ids = np.arange(count + 1, count + len(cdata) + 1).reshape(-1, 1)
+            fmt = f"{abbrev} {meshio_to_flac3d_type[ctype]} %d " + " ".join(
+                ["%d"] * cdata.shape[1]
+            )
+            np.savetxt(f, np.hstack([ids, cdata + 1]), fmt=fmt)
+            count += len(cdata)
 
 
 def _write_groups(f, cells, cell_data, field_data, flag, binary):
@@ -438,30 +566,26 @@ def _translate_zones(points, cells):
     Four first points must form a right-handed coordinate system (outward normal vectors).
     Reorder corner points according to sign of scalar triple products.
     """
-    # See <https://stackoverflow.com/a/42386330/353337>
-    def slicing_summing(a, b, c):
-        c0 = b[:, 1] * c[:, 2] - b[:, 2] * c[:, 1]
-        c1 = b[:, 2] * c[:, 0] - b[:, 0] * c[:, 2]
-        c2 = b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0]
-        return a[:, 0] * c0 + a[:, 1] * c1 + a[:, 2] * c2
-
     zones = []
     for key, idx in cells:
         if key not in meshio_only["zone"].keys():
             continue
 
-        # Compute scalar triple products
+        # Compute scalar triple products as 3x3 determinants in a single
+        # gufunc pass instead of seven full-length temporaries
         key = meshio_only["zone"][key]
-        tmp = points[idx[:, meshio_to_flac3d_order[key][:4]].T]
-        det = slicing_summing(tmp[1] - tmp[0], tmp[2] - tmp[0], tmp[3] - tmp[0])
+        corners = points[idx[:, meshio_to_flac3d_order[key][:4]]]
+        det = np.linalg.det(corners[:, 1:] - corners[:, :1])
 
-        # Reorder corner points
-        data = np.where(
+        # Reorder corner points. Select the per-cell permutation first and
+        # gather once, rather than materializing both full gathers and
+        # discarding half of each.
+        perm = np.where(
             (det > 0)[:, None],
-            idx[:, meshio_to_flac3d_order[key]],
-            idx[:, meshio_to_flac3d_order_2[key]],
+            meshio_to_flac3d_order[key],
+            meshio_to_flac3d_order_2[key],
         )
-        zones.append((key, data))
+        zones.append((key, np.take_along_axis(idx, perm, axis=1)))
 
     return zones
 
@@ -485,14 +609,18 @@ def _translate_groups(cells, cell_data, field_data, flag):
     num_dims = np.concatenate(
         [np.full(len(c[1]), 2 if c[0] in meshio_only["face"] else 3) for c in cells]
     )
-    groups = {
-        k: np.nonzero(np.logical_and(cell_data == k, num_dims == flag_to_numdim[flag]))[
-            0
-        ]
-        + 1
-        for k in np.unique(cell_data)
-    }
-    groups = {k: v for k, v in groups.items() if v.size}
+    # Bucket the cell indices by group value with one stable sort instead of
+    # one full-array comparison per unique value
+    positions = np.flatnonzero(num_dims == flag_to_numdim[flag]) + 1
+    zone_data = cell_data[positions - 1]
+    if len(zone_data):
+        order = np.argsort(zone_data, kind="stable")
+        sorted_data = zone_data[order]
+        boundaries = np.flatnonzero(np.diff(sorted_data)) + 1
+        keys = sorted_data[np.r_[0, boundaries]]
+        groups = dict(zip(keys.tolist(), np.split(positions[order], boundaries)))
+    else:
+        groups = {}
 
     labels = {k: str(k) for k in groups.keys()}
     labels[0] = "None"
@@ -506,11 +634,12 @@ def _translate_groups(cells, cell_data, field_data, flag):
 
 def _write_table(f, data, ncol=20):
     """Write group data table."""
+    data = np.asarray(data)
     nrow = len(data) // ncol
-    lines = np.split(data, np.full(nrow, ncol).cumsum())
-    for line in lines:
-        if len(line):
-            f.write(" {}\n".format(" ".join([str(l) for l in line])))
+    np.savetxt(f, data[: nrow * ncol].reshape(nrow, ncol), fmt=" %d", delimiter="")
+    if len(data) > nrow * ncol:
+        # ragged last row
+        np.savetxt(f, data[nrow * ncol :].reshape(1, -1), fmt=" %d", delimiter="")
 
 
 register("flac3d", [".f3grid"], read, {"flac3d": write})
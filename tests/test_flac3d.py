@@ -1,6 +1,8 @@
 import copy
 import pathlib
+import struct
 import sys
+import tempfile
 
 import numpy as np
 import pytest
@@ -9,6 +11,47 @@ import meshio
 
 from . import helpers
 
+ascii_ref = """* FLAC3D grid produced by hand
+* comment line
+G\t1\t0.0\t0.0\t0.0
+G 2 1.0 0.0 0.0
+G 3 1.0 1.0 0.0
+G 4 0.0 1.0 0.0
+G 5 0.0 0.0 1.0
+G 6 1.0 0.0 1.0
+G 7 1.0 1.0 1.0
+G 8 0.0 1.0 1.0
+G 9 0.0 0.0 2.0
+G 10 1.0 0.0 2.0
+G 11 0.5 0.5 2.5
+G 12 2.0 0.0 0.0
+G 20 2.0 1.0 0.0
+Z B8 1 1 2 4 5 3 6 8 7
+* a comment between cells
+Z B7 2 5 6 8 9 7 10 11
+Z T4 3 5 6 8 9
+Z B8 4 2 12 3 6 20 10 7 7
+F Q4 1 1 2 3 4
+F T3 2 1 2 5
+F Q4 3 5 6 7 8
+ZGROUP "Lower" SLOT 1
+1 4
+ZGROUP 'Upper' SLOT 1
+2
+3
+FGROUP "Sides"
+1 3
+FGROUP "Caps"
+2
+"""
+
+
+def _read_from_string(content):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = pathlib.Path(temp_dir) / "test.f3grid"
+        filename.write_text(content)
+        return meshio.read(filename)
+
 
 @pytest.mark.parametrize(
     "mesh, data",
@@ -66,3 +109,179 @@ def test_reference_file(filename):
     # Cell data
     ref_sum_cell_data = [num_cell[1] for num_cell in ref_num_cells]
     assert [len(arr) for arr in mesh.cell_data["flac3d:group"]] == ref_sum_cell_data
+
+
+def test_ascii_file():
+    mesh = _read_from_string(ascii_ref)
+
+    # points
+    assert np.isclose(mesh.points.sum(), 25.5)
+
+    # cells: B8 and B7 merge into one hexahedron block, comments and the
+    # sparse gridpoint ID (20) must not break the runs
+    assert [(c.type, len(c.data)) for c in mesh.cells] == [
+        ("hexahedron", 2),
+        ("tetra", 1),
+        ("hexahedron", 1),
+        ("quad", 1),
+        ("triangle", 1),
+        ("quad", 1),
+    ]
+    assert mesh.cells[0].data.tolist() == [
+        [0, 1, 2, 3, 4, 7, 6, 5],
+        # B7: the last vertex is duplicated into a degenerate brick
+        [4, 5, 6, 7, 8, 10, 10, 9],
+    ]
+    assert mesh.cells[1].data.tolist() == [[4, 5, 7, 8]]
+
+    # groups (multi-line data, single- and double-quoted names)
+    assert [a.tolist() for a in mesh.cell_data["flac3d:group"]] == [
+        [1, 2],
+        [2],
+        [1],
+        [3],
+        [4],
+        [3],
+    ]
+    assert {k: v.tolist() for k, v in mesh.field_data.items()} == {
+        "Lower": [1, 3],
+        "Upper": [2, 3],
+        "Sides": [3, 2],
+        "Caps": [4, 2],
+    }
+
+
+@pytest.mark.parametrize("content", ["", "\n\n  \n"])
+def test_empty_file(content):
+    mesh = _read_from_string(content)
+
+    assert len(mesh.points) == 0
+    assert len(mesh.cells) == 0
+
+
+def test_sparse_point_id():
+    # One stray huge gridpoint ID must hit the sorted-search fallback of the
+    # ID LUT instead of allocating a dense multi-GB table
+    mesh = _read_from_string(
+        "G 1 0.0 0.0 0.0\n"
+        "G 2 1.0 0.0 0.0\n"
+        "G 3 1.0 1.0 0.0\n"
+        "G 4000000000 0.0 0.0 1.0\n"
+        "Z T4 1 1 2 3 4000000000\n"
+    )
+
+    assert mesh.cells[0].type == "tetra"
+    assert mesh.cells[0].data.tolist() == [[0, 1, 2, 3]]
+
+
+@pytest.mark.parametrize(
+    "cell_line",
+    [
+        # 4 falls in a gap of the point-ID range
+        "Z T4 1 1 2 3 4\n",
+        # 9 lies beyond the point-ID range
+        "Z T4 1 1 2 3 9\n",
+    ],
+)
+def test_unknown_point_id(cell_line):
+    content = (
+        "G 1 0.0 0.0 0.0\n"
+        "G 2 1.0 0.0 0.0\n"
+        "G 3 1.0 1.0 0.0\n"
+        "G 5 0.0 0.0 1.0\n" + cell_line
+    )
+    with pytest.raises(meshio.ReadError):
+        _read_from_string(content)
+
+
+@pytest.mark.parametrize("group_data", ["1 3", "1 9"])
+def test_unknown_group_cell_id(group_data):
+    # Cell IDs are 1 and 5; a group entry naming a cell in the gap (3) or
+    # beyond the range (9) must not silently tag another cell
+    content = (
+        "G 1 0.0 0.0 0.0\n"
+        "G 2 1.0 0.0 0.0\n"
+        "G 3 1.0 1.0 0.0\n"
+        "G 4 0.0 0.0 1.0\n"
+        "Z T4 1 1 2 3 4\n"
+        "Z T4 5 1 2 4 3\n"
+        f'ZGROUP "A"\n{group_data}\n'
+    )
+    with pytest.raises(meshio.ReadError):
+        _read_from_string(content)
+
+
+def test_binary_mixed_cells():
+    # Mixed-vertex-count zones (B8 + B7 + T4) break the uniform record
+    # stride, so this exercises the run-detection walk of the binary cell
+    # reader, the offset hand-over to the group records, and the face
+    # section that follows
+    buf = struct.pack("<2I", 1375135718, 3)
+
+    points = [
+        (1, 0.0, 0.0, 0.0),
+        (2, 1.0, 0.0, 0.0),
+        (3, 1.0, 1.0, 0.0),
+        (4, 0.0, 1.0, 0.0),
+        (5, 0.0, 0.0, 1.0),
+        (6, 1.0, 0.0, 1.0),
+        (7, 1.0, 1.0, 1.0),
+        (8, 0.0, 1.0, 1.0),
+        (9, 0.0, 0.0, 2.0),
+        (10, 1.0, 0.0, 2.0),
+        (11, 0.5, 0.5, 2.5),
+    ]
+    buf += struct.pack("<I", len(points))
+    for point in points:
+        buf += struct.pack("<I3d", point[0], *point[1:])
+
+    zones = [
+        (1, [1, 2, 4, 5, 3, 6, 8, 7]),
+        (2, [5, 6, 8, 9, 7, 10, 11]),
+        (3, [5, 6, 8, 9]),
+    ]
+    faces = [(1, [1, 2, 3, 4]), (2, [5, 6, 7, 8])]
+    zgroups = [(b"Lower", [1]), (b"Upper", [2, 3])]
+    fgroups = [(b"Sides", [1, 2])]
+    for cells, groups in [(zones, zgroups), (faces, fgroups)]:
+        buf += struct.pack("<I", len(cells))
+        for cid, verts in cells:
+            buf += struct.pack(f"<2I{len(verts)}I", cid, len(verts), *verts)
+        buf += struct.pack("<I", len(groups))
+        for name, data in groups:
+            buf += struct.pack("<H", len(name)) + name
+            buf += struct.pack("<H7s", 7, b"Default")
+            buf += struct.pack(f"<I{len(data)}I", len(data), *data)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = pathlib.Path(temp_dir) / "test.f3grid"
+        filename.write_bytes(buf)
+        mesh = meshio.read(filename)
+
+    # points
+    assert np.isclose(mesh.points.sum(), 20.5)
+
+    # cells: the B8 and B7 zones merge into one hexahedron block
+    assert [(c.type, len(c.data)) for c in mesh.cells] == [
+        ("hexahedron", 2),
+        ("tetra", 1),
+        ("quad", 2),
+    ]
+    assert mesh.cells[0].data.tolist() == [
+        [0, 1, 2, 3, 4, 7, 6, 5],
+        # B7: the last vertex is duplicated into a degenerate brick
+        [4, 5, 6, 7, 8, 10, 10, 9],
+    ]
+    assert mesh.cells[1].data.tolist() == [[4, 5, 7, 8]]
+
+    # groups
+    assert [a.tolist() for a in mesh.cell_data["flac3d:group"]] == [
+        [1, 2],
+        [2],
+        [3, 3],
+    ]
+    assert {k: v.tolist() for k, v in mesh.field_data.items()} == {
+        "Lower": [1, 3],
+        "Upper": [2, 3],
+        "Sides": [3, 2],
+    }